@@ -1,16 +1,20 @@
 """Core agent implementation using LangChain. (Legacy!!!!! Not In Use anymore)"""
 
 import os
-from datetime import date
+from functools import lru_cache
 
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import create_react_agent
 
+from agent.food_names import translate_food_names
+from agent.prompt import _today_iso
 from agent.tools import inventory_tools
 
 
-# System prompt for the kitchen assistant
+# System prompt for the kitchen assistant.
+# Chinese food names are translated to English deterministically before the
+# agent runs (see agent.food_names), so the prompt carries no mapping table.
 SYSTEM_PROMPT = """You are a Smart Kitchen Assistant that helps manage grocery inventory.
 
 ## Your Capabilities
@@ -22,8 +26,6 @@ You can:
 
 ## Important Rules
 1. **ALWAYS use English item names when calling tools** (database uses English)
-   - 牛奶 → Milk, 鸡蛋 → Eggs, 鸡肉 → Chicken, 面包 → Bread
-   - 苹果 → Apple, 香蕉 → Banana, 酸奶 → Yogurt, 奶酪 → Cheese
 2. ALWAYS query inventory first if you need to know what's available
 3. For consumption: the system uses FEFO (First Expired, First Out)
    - Open items are consumed first
@@ -46,26 +48,35 @@ You can:
 """
 
 
-def get_agent():
-    """Create and return the agent executor."""
+@lru_cache(maxsize=4)
+def _system_message(today_iso: str) -> SystemMessage:
+    """Format the system prompt for a given date (cached per day)."""
+    return SystemMessage(content=SYSTEM_PROMPT.format(today=today_iso))
+
+
+@lru_cache(maxsize=4)
+def _build_agent(today_iso: str):
+    """Build the agent executor for a given date (cached per day)."""
     llm = ChatOpenAI(
         model="gpt-4o",
         temperature=0,
         api_key=os.getenv("OPENAI_API_KEY"),
     )
 
-    # Format system prompt with today's date
-    system_message = SystemMessage(content=SYSTEM_PROMPT.format(today=date.today().isoformat()))
+    system_message = _system_message(today_iso)
 
     # Create the agent using LangGraph's prebuilt ReAct agent
     # Use prompt parameter instead of state_modifier
-    agent = create_react_agent(
+    return create_react_agent(
         model=llm,
         tools=inventory_tools,
         prompt=system_message,
     )
 
-    return agent
+
+def get_agent():
+    """Return the agent executor, rebuilding only when the date changes."""
+    return _build_agent(_today_iso())
 
 
 def run_agent(user_input: str) -> dict:
@@ -79,6 +90,9 @@ def run_agent(user_input: str) -> dict:
     """
     agent = get_agent()
 
+    # Map Chinese food names to English before the LLM sees the input
+    user_input = translate_food_names(user_input)
+
     # Run the agent
     result = agent.invoke({
         "messages": [HumanMessage(content=user_input)]
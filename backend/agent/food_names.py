@@ -0,0 +1,27 @@
+"""Deterministic Chinese -> English food name translation.
+
+The database stores English item names, so Chinese names must be mapped
+before tool calls. Doing this with a fixed dictionary in Python (instead
+of instructing the LLM to translate) keeps the system prompt shorter and
+removes a source of inconsistent translations.
+"""
+
+import re
+
+NAME_MAP = {
+    "牛奶": "Milk",
+    "鸡蛋": "Eggs",
+    "鸡肉": "Chicken",
+    "面包": "Bread",
+    "苹果": "Apple",
+    "香蕉": "Banana",
+    "酸奶": "Yogurt",
+    "奶酪": "Cheese",
+}
+
+_NAME_RE = re.compile("|".join(map(re.escape, NAME_MAP)))
+
+
+def translate_food_names(text: str) -> str:
+    """Replace known Chinese food names in ``text`` with their English names."""
+    return _NAME_RE.sub(lambda m: NAME_MAP[m.group()], text)
@@ -1,12 +1,21 @@
 """LangGraph construction for the Kitchen Loop AI tool-calling agent."""
 
-import json
+import asyncio
+import logging
 import queue
 import threading
 import uuid
 from typing import Any, Generator
 
-from langchain_core.messages import BaseMessageChunk, SystemMessage
+import orjson
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessageChunk,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
 from langgraph.graph import StateGraph, END
 
 from database import _current_access_token
@@ -20,9 +29,22 @@ from agent.nodes import (
     execute_write_tools,
     respond,
 )
+from agent.food_names import translate_food_names
 from agent.prompt import get_system_prompt
 from database import get_supabase_client
 
+logger = logging.getLogger(__name__)
+
+
+def _route_after_input(state: AgentState) -> str:
+    """Route after handle_input: confirmed -> execute_write, completed -> respond."""
+    status = state.get("status")
+    if status == "confirmed":
+        return "execute_write"
+    if status == "completed":
+        return "respond"
+    return "agent"
+
 
 def build_graph() -> StateGraph:
     """Build and return the tool-calling agent graph."""
@@ -40,9 +62,7 @@ def build_graph() -> StateGraph:
     # After handle_input: if confirmed -> execute_write, otherwise -> agent
     graph.add_conditional_edges(
         "handle_input",
-        lambda state: "execute_write" if state.get("status") == "confirmed" else (
-            "respond" if state.get("status") == "completed" else "agent"
-        ),
+        _route_after_input,
         {
             "agent": "agent",
             "execute_write": "execute_write",
@@ -92,12 +112,14 @@ class SupabaseCheckpointer:
 
     def put(self, thread_id: str, user_id: str, data: dict):
         supabase = get_supabase_client()
+        # returning="minimal": don't ship the (large) checkpoint back in the
+        # response — we only care that the upsert succeeded.
         supabase.table("agent_conversations").upsert({
             "thread_id": thread_id,
             "user_id": user_id,
             "checkpoint_data": data,
             "status": "active",
-        }, on_conflict="thread_id").execute()
+        }, on_conflict="thread_id", returning="minimal").execute()
 
     def complete(self, thread_id: str, final_messages: list[dict]):
         """Mark conversation completed and save final message history."""
@@ -105,26 +127,78 @@ class SupabaseCheckpointer:
         supabase.table("agent_conversations").update({
             "status": "completed",
             "checkpoint_data": {"messages": final_messages},
-        }).eq("thread_id", thread_id).execute()
+        }, returning="minimal").eq("thread_id", thread_id).execute()
 
 
 checkpointer = SupabaseCheckpointer()
 
-# Pre-compile graph once (structure is static; state varies per request)
-_compiled_app = build_graph().compile()
+# Compile the graph once and reuse it for every request — graph structure is
+# static; only the state varies. Built lazily behind a lock so importing this
+# module stays cheap (e.g. for scripts that only need the checkpointer).
+_compiled_app = None
+_compile_lock = threading.Lock()
+
+
+def _get_app():
+    """Return the compiled graph, building it on first use."""
+    global _compiled_app
+    if _compiled_app is None:
+        with _compile_lock:
+            if _compiled_app is None:
+                _compiled_app = build_graph().compile()
+    return _compiled_app
+
+
+def _ser_plain(m) -> dict:
+    return {"role": m.type, "content": m.content}
+
+
+def _ser_ai(m) -> dict:
+    msg_dict: dict[str, Any] = {"role": m.type, "content": m.content}
+    if m.tool_calls:
+        msg_dict["tool_calls"] = m.tool_calls
+    return msg_dict
+
+
+def _ser_tool(m) -> dict:
+    msg_dict: dict[str, Any] = {"role": m.type, "content": m.content}
+    if m.tool_call_id:
+        msg_dict["tool_call_id"] = m.tool_call_id
+    return msg_dict
+
+
+# Type -> serializer dispatch; avoids per-message hasattr probing.
+_SERIALIZERS = {
+    dict: lambda m: m,
+    HumanMessage: _ser_plain,
+    SystemMessage: _ser_plain,
+    AIMessage: _ser_ai,
+    ToolMessage: _ser_tool,
+}
 
 
-def _serialize_messages(messages: list) -> list[dict]:
-    """Convert LangChain messages to serializable dicts for checkpointing."""
+def _serialize_messages(messages: list, prefix: list[dict] | None = None) -> list[dict]:
+    """Convert LangChain messages to serializable dicts for checkpointing.
+
+    ``prefix`` is the already-serialized history loaded from the checkpoint at
+    the start of the turn. Nodes only ever append messages, so the prefix is
+    reused verbatim and only the new tail is serialized — checkpointing work
+    stays proportional to the turn, not the conversation length.
+    """
+    if prefix and len(messages) >= len(prefix):
+        return prefix + _serialize_messages(messages[len(prefix):])
+
     serialized = []
     for m in messages:
-        if hasattr(m, "type") and hasattr(m, "content"):
+        ser = _SERIALIZERS.get(type(m))
+        if ser is not None:
+            serialized.append(ser(m))
+        elif hasattr(m, "type") and hasattr(m, "content"):
+            # Unknown message subclass — fall back to reflection
             msg_dict: dict[str, Any] = {"role": m.type, "content": m.content}
-            # Preserve tool calls on AIMessages
-            if hasattr(m, "tool_calls") and m.tool_calls:
+            if getattr(m, "tool_calls", None):
                 msg_dict["tool_calls"] = m.tool_calls
-            # Preserve tool_call_id on ToolMessages
-            if hasattr(m, "tool_call_id") and m.tool_call_id:
+            if getattr(m, "tool_call_id", None):
                 msg_dict["tool_call_id"] = m.tool_call_id
             serialized.append(msg_dict)
         elif isinstance(m, dict):
@@ -137,11 +211,25 @@ def _build_input_state(
     user_id: str,
     thread_id: str,
     confirm_action: bool | None,
-) -> dict[str, Any]:
-    """Build the graph input state from request params + checkpoint."""
-    existing_state = checkpointer.get(thread_id)
+    is_new_thread: bool = False,
+) -> tuple[dict[str, Any], list[dict]]:
+    """Build the graph input state from request params + checkpoint.
+
+    Returns the input state plus the serialized message history as loaded,
+    so the checkpoint save can reuse it instead of re-serializing.
 
-    input_text = ("confirm" if confirm_action else "cancel") if confirm_action is not None else text
+    ``is_new_thread`` marks threads whose ID we just generated — there can be
+    no checkpoint for them, so the lookup round-trip is skipped.
+    """
+    existing_state = None if is_new_thread else checkpointer.get(thread_id)
+
+    if confirm_action is not None:
+        input_text = "confirm" if confirm_action else "cancel"
+    else:
+        # Deterministic pre-pass: map common Chinese food names to the English
+        # item names the tools expect, so the LLM doesn't spend prompt tokens
+        # (or risk inconsistency) on that translation.
+        input_text = translate_food_names(text)
 
     input_state: dict[str, Any] = {}
     if existing_state:
@@ -152,26 +240,45 @@ def _build_input_state(
     else:
         input_state["messages"] = []
 
+    # Per-turn language hint, detected from the ORIGINAL text — the food-name
+    # pre-pass may strip the only CJK characters from a short message, and the
+    # translated form is what gets persisted in history. The hint rides the
+    # checkpoint so confirm/cancel turns keep the prior turn's language.
+    from agent.nodes import _CJK_RE, _SKIP_WORDS, _get_user_language
+    stripped = text.strip().lower() if confirm_action is None and text else ""
+    if stripped and stripped not in _SKIP_WORDS:
+        input_state["user_lang"] = "zh" if _CJK_RE.search(text) else "en"
+    elif existing_state and existing_state.get("user_lang"):
+        input_state["user_lang"] = existing_state["user_lang"]
+
     has_system = any(
         isinstance(m, SystemMessage) or (isinstance(m, dict) and m.get("role") == "system")
         for m in input_state["messages"]
     )
     if not has_system:
-        from agent.nodes import _get_user_language
         user_lang = _get_user_language(user_id)
-        if any("\u4e00" <= c <= "\u9fff" for c in input_text):
+        # Check the original text: the food-name pre-pass may have replaced
+        # the only CJK characters in an all-Chinese message.
+        if _CJK_RE.search(text or input_text):
             user_lang = "zh"
         system_msg = {"role": "system", "content": get_system_prompt(user_lang)}
-        input_state["messages"] = [system_msg] + input_state["messages"]
+        input_state["messages"].insert(0, system_msg)
 
-    input_state["messages"] = input_state["messages"] + [
-        {"role": "user", "content": input_text}
-    ]
+    input_state["messages"].append({"role": "user", "content": input_text})
     input_state["user_id"] = user_id
-    return input_state
+    return input_state, list(input_state["messages"])
 
 
-def _build_response(result: dict, thread_id: str) -> dict:
+# Tool name -> frontend intent label
+_INTENT_MAP = {
+    "add_item": "ADD",
+    "consume_item": "CONSUME",
+    "discard_batch": "DISCARD",
+    "update_item": "UPDATE",
+}
+
+
+def _build_response(result: dict, thread_id: str, serialized_prefix: list[dict] | None = None) -> dict:
     """Build the API response dict from graph result + save checkpoint."""
     response = result.get("response", "")
     status = result.get("status", "completed")
@@ -180,30 +287,25 @@ def _build_response(result: dict, thread_id: str) -> dict:
     pending_recipes = result.get("pending_recipes")
 
     # Save checkpoint
-    messages_to_save = _serialize_messages(result.get("messages", []))
+    messages_to_save = _serialize_messages(result.get("messages", []), serialized_prefix)
     checkpoint = {
         "messages": messages_to_save,
         "pending_writes": pending_writes,
         "pending_recipes": pending_recipes,
         "agent_status": status,
         "user_id": result.get("user_id", ""),
+        "user_lang": result.get("user_lang", ""),
     }
     checkpointer.put(thread_id, result.get("user_id", ""), checkpoint)
 
     # Build pending_action for frontend
     pending_dict = None
     if pending_writes:
-        intent_map = {
-            "add_item": "ADD",
-            "consume_item": "CONSUME",
-            "discard_batch": "DISCARD",
-            "update_item": "UPDATE",
-        }
         pending_dict = {
             "items": [
                 {
                     "index": i,
-                    "intent": intent_map.get(pw["tool"], pw["tool"].upper()),
+                    "intent": _INTENT_MAP.get(pw["tool"], pw["tool"].upper()),
                     "extracted_info": pw["args"],
                     "missing_fields": [],
                 }
@@ -222,24 +324,30 @@ def _build_response(result: dict, thread_id: str) -> dict:
     }
 
 
-def run_agent(
+async def run_agent(
     text: str,
     user_id: str,
     thread_id: str | None = None,
     confirm_action: bool | None = None,
 ) -> dict:
-    """Run the agent synchronously (blocking). Returns full result dict."""
-    if not thread_id:
+    """Run the agent asynchronously. Returns full result dict.
+
+    The graph is awaited via ``ainvoke`` so concurrent agent sessions don't
+    block the event loop on LLM I/O; the blocking Supabase checkpoint calls
+    run in worker threads.
+    """
+    is_new_thread = not thread_id
+    if is_new_thread:
         thread_id = str(uuid.uuid4())
 
-    input_state = _build_input_state(text, user_id, thread_id, confirm_action)
+    input_state, serialized_prefix = await asyncio.to_thread(
+        _build_input_state, text, user_id, thread_id, confirm_action, is_new_thread
+    )
 
     try:
-        result = _compiled_app.invoke(input_state, config={"recursion_limit": 25})
+        result = await _get_app().ainvoke(input_state, config={"recursion_limit": 25})
     except Exception as e:
-        print(f"[ERROR] Graph execution failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Graph execution failed")
         return {
             "response": f"Error: {str(e)}",
             "thread_id": thread_id,
@@ -248,12 +356,14 @@ def run_agent(
             "tool_calls": [],
         }
 
-    return _build_response(result, thread_id)
+    return await asyncio.to_thread(_build_response, result, thread_id, serialized_prefix)
 
 
 def _sse(event: str, data: dict) -> str:
     """Format a Server-Sent Event."""
-    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    # orjson emits UTF-8 directly (no ensure_ascii escaping) and is
+    # considerably faster than stdlib json for the per-token event stream.
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
 
 
 def _extract_fragments(content: Any) -> list[tuple[str, str]]:
@@ -305,10 +415,13 @@ def run_agent_stream(
     native ``stream_mode=["messages", "updates"]``. ``messages`` yields model
     chunks immediately; ``updates`` yields completed node updates for progress.
     """
-    if not thread_id:
+    is_new_thread = not thread_id
+    if is_new_thread:
         thread_id = str(uuid.uuid4())
 
-    input_state = _build_input_state(text, user_id, thread_id, confirm_action)
+    input_state, serialized_prefix = _build_input_state(
+        text, user_id, thread_id, confirm_action, is_new_thread
+    )
 
     # Yield thread_id immediately so frontend can track it
     yield _sse("thread_id", {"thread_id": thread_id})
@@ -331,7 +444,7 @@ def run_agent_stream(
         try:
             last_state: dict[str, Any] = {}
 
-            for mode, payload in _compiled_app.stream(
+            for mode, payload in _get_app().stream(
                 input_state,
                 config={"recursion_limit": 25},
                 stream_mode=["messages", "updates"],
@@ -403,9 +516,7 @@ def run_agent_stream(
         # Thread finished — build and yield final response
         if error_holder:
             e = error_holder[0]
-            print(f"[ERROR] Stream graph execution failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Stream graph execution failed", exc_info=e)
             yield _sse("done", {
                 "response": f"Error: {str(e)}",
                 "thread_id": thread_id,
@@ -415,7 +526,7 @@ def run_agent_stream(
                 "pending_recipes": None,
             })
         elif result_holder:
-            final = _build_response(result_holder[0], thread_id)
+            final = _build_response(result_holder[0], thread_id, serialized_prefix)
             yield _sse("done", final)
         else:
             yield _sse("done", {
@@ -19,6 +19,16 @@ from database import get_supabase_client
 _llm_cache: dict[str, tuple[BaseChatModel, float]] = {}
 _cache_lock = threading.Lock()
 _CACHE_TTL = 300  # 5 minutes
+_CACHE_MAX = 10_000  # hard cap so the cache can't grow unbounded
+
+# Opt in to Anthropic prompt caching; the system prompt is marked with
+# cache_control in the agent node (see nodes._tag_cache_control).
+_ANTHROPIC_CACHE_HEADERS = {"anthropic-beta": "prompt-caching-2024-07-31"}
+
+# Generation cap: agent replies are short confirmations/summaries, so
+# bound worst-case generation latency (O(tokens out)). Matches the
+# ChatAnthropic default, which already applies this limit.
+_MAX_OUTPUT_TOKENS = 1024
 
 
 def _build_llm(user_id: str) -> BaseChatModel:
@@ -48,6 +58,7 @@ def _build_llm(user_id: str) -> BaseChatModel:
                 model=config["model_id"],
                 temperature=0,
                 streaming=True,
+                max_tokens=_MAX_OUTPUT_TOKENS,
             )
         elif config["provider"] == "anthropic":
             return ChatAnthropic(
@@ -55,6 +66,7 @@ def _build_llm(user_id: str) -> BaseChatModel:
                 model=config["model_id"],
                 temperature=0,
                 streaming=True,
+                default_headers=_ANTHROPIC_CACHE_HEADERS,
             )
         elif config["provider"] == "minimax":
             return ChatAnthropic(
@@ -63,6 +75,7 @@ def _build_llm(user_id: str) -> BaseChatModel:
                 model=config["model_id"],
                 temperature=0,
                 streaming=True,
+                default_headers=_ANTHROPIC_CACHE_HEADERS,
             )
         elif config["provider"] == "minimax_cn":
             return ChatAnthropic(
@@ -71,6 +84,7 @@ def _build_llm(user_id: str) -> BaseChatModel:
                 model=config["model_id"],
                 temperature=0,
                 streaming=True,
+                default_headers=_ANTHROPIC_CACHE_HEADERS,
             )
 
     # Fallback to platform key for Free/Supporter users
@@ -80,6 +94,7 @@ def _build_llm(user_id: str) -> BaseChatModel:
             model=PLATFORM_MODEL,
             temperature=0,
             streaming=True,
+            max_tokens=_MAX_OUTPUT_TOKENS,
         )
 
     raise ValueError("No AI provider configured. Please add an API key in settings.")
@@ -103,6 +118,13 @@ def get_user_llm(user_id: str) -> BaseChatModel:
     llm = _build_llm(user_id)
 
     with _cache_lock:
+        if len(_llm_cache) >= _CACHE_MAX:
+            # Drop expired entries first; if still full, start fresh
+            expired = [k for k, (_, exp) in _llm_cache.items() if exp <= now]
+            for k in expired:
+                del _llm_cache[k]
+            if len(_llm_cache) >= _CACHE_MAX:
+                _llm_cache.clear()
         _llm_cache[user_id] = (llm, now + _CACHE_TTL)
 
     return llm
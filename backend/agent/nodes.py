@@ -1,12 +1,20 @@
 """Node implementations for the tool-calling LangGraph agent."""
 
-import json
+import contextvars
+import logging
+import operator
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import date
 from typing import Any
 
+import orjson
+
 from langchain_core.messages import AIMessage, SystemMessage, ToolMessage
 
-from agent.state import AgentState, READ_TOOLS, WRITE_TOOLS
+from agent.state import AgentState, TOOL_KIND
 from agent.tools import ALL_TOOLS
 from agent.llm_factory import get_user_llm
 
@@ -36,6 +44,50 @@ from services import (
 from schemas import InventoryItemCreate
 from database import get_supabase_client
 
+logger = logging.getLogger(__name__)
+
+
+# CJK detection: one compiled character-class scan (in C) instead of a
+# per-character Python loop over the message text.
+_CJK_RE = re.compile(r"[一-鿿]")
+
+# Pure confirmation/cancellation words carry no language signal
+_SKIP_WORDS = frozenset({
+    "confirm", "cancel", "yes", "no", "y", "n", "ok",
+    "是", "好", "确认", "确定", "执行", "否", "不", "取消", "算了",
+})
+
+
+def _msg_type_content(msg) -> tuple[Any, Any]:
+    """Resolve a message's type/role and content in one probe.
+
+    Handles both LangChain message objects and plain dicts, so callers
+    don't repeat the attribute-vs-key dance per field.
+    """
+    msg_type = getattr(msg, "type", None)
+    if msg_type is not None:
+        return msg_type, msg.content
+    if isinstance(msg, dict):
+        return msg.get("role"), msg.get("content")
+    return None, None
+
+
+def _iter_human_contents(messages: list):
+    """Yield human/user message contents, newest first."""
+    for msg in reversed(messages):
+        msg_type, content = _msg_type_content(msg)
+        if msg_type in ("human", "user"):
+            yield content
+
+
+def _latest_human_content(messages: list) -> str:
+    """Most recent substantive (non-confirmation) human message text."""
+    for content in _iter_human_contents(messages):
+        text = _extract_text(content)
+        if text.strip().lower() not in _SKIP_WORDS:
+            return text
+    return ""
+
 
 def _detect_language(messages: list) -> str:
     """Detect if user is speaking Chinese or English from human messages only.
@@ -44,99 +96,138 @@ def _detect_language(messages: list) -> str:
     false positives from Chinese examples in the system prompt.
     Skips pure confirmation/cancellation words.
     """
-    skip_content = {
-        "confirm", "cancel", "yes", "no", "y", "n", "ok",
-        "是", "好", "确认", "确定", "执行", "否", "不", "取消", "算了",
-    }
-    for msg in reversed(messages):
-        # Determine message type
-        msg_type = getattr(msg, "type", None)
-        if msg_type is None and isinstance(msg, dict):
-            msg_type = msg.get("role")
-        # Only check human/user messages
-        if msg_type not in ("human", "user"):
-            continue
-        content = msg.content if hasattr(msg, "content") else msg.get("content", "")
+    for content in _iter_human_contents(messages):
         if not isinstance(content, str):
             continue
         # Skip pure confirmation/cancellation words
-        if content.strip().lower() in skip_content:
+        if content.strip().lower() in _SKIP_WORDS:
             continue
         # Detect language from first substantive human message
-        if any("\u4e00" <= char <= "\u9fff" for char in content):
+        if _CJK_RE.search(content):
             return "zh"
         if content.strip():
             return "en"
     return "en"
 
 
+# Preferred language is effectively static, so cache it per user with a
+# TTL (same shape as llm_factory's cache) instead of paying a profile
+# round trip on every new conversation. Invalidated on profile update.
+_lang_cache: dict[str, tuple[str, float]] = {}
+_lang_cache_lock = threading.Lock()
+_LANG_CACHE_TTL = 300  # seconds
+_LANG_CACHE_MAX = 4096
+
+
 def _get_user_language(user_id: str) -> str:
-    """Get user's preferred language from profile."""
+    """Get user's preferred language from profile (cached with TTL)."""
+    now = time.monotonic()
+    with _lang_cache_lock:
+        cached = _lang_cache.get(user_id)
+        if cached and cached[1] > now:
+            return cached[0]
+
+    lang = "en"
     try:
         supabase = get_supabase_client()
         result = supabase.table("profiles").select("preferred_language").eq("id", user_id).limit(1).execute()
         if result.data:
-            return result.data[0].get("preferred_language", "en")
+            lang = result.data[0].get("preferred_language", "en")
     except Exception:
-        pass
-    return "en"
+        return "en"  # don't cache failures
+
+    with _lang_cache_lock:
+        if len(_lang_cache) >= _LANG_CACHE_MAX:
+            expired = [k for k, (_, exp) in _lang_cache.items() if exp <= now]
+            for k in expired:
+                del _lang_cache[k]
+            if len(_lang_cache) >= _LANG_CACHE_MAX:
+                _lang_cache.clear()
+        _lang_cache[user_id] = (lang, now + _LANG_CACHE_TTL)
+
+    return lang
+
+
+def invalidate_user_language(user_id: str) -> None:
+    """Clear cached language for a user (call when their profile changes)."""
+    with _lang_cache_lock:
+        _lang_cache.pop(user_id, None)
 
 
 # ============ Node: handle_input ============
 
+# Confirmation vocabulary, hoisted so handle_input doesn't rebuild the
+# sets (and recompile the negation scan) on every turn.
+_CONFIRM_WORDS = frozenset({
+    "confirm", "yes", "y", "ok",
+    "是", "好", "可以", "行", "嗯", "对", "确认", "确定", "执行",
+})
+_CANCEL_WORDS = frozenset({
+    "cancel", "no", "n", "否", "不", "取消", "算了", "不要了", "不执行",
+})
+_NEGATION_RE = re.compile("不对|不是|不行|错了|wrong|not right|wait")
+
+# Whitespace/punctuation stripped before vocabulary matching, so
+# "yes!", "好的。", "ok ~" all hit the word sets directly.
+_STRIP_PUNCT = str.maketrans("", "", " \t\n\r.,。，!！?？~～")
+
+
 def handle_input(state: AgentState) -> dict:
     """
     Handle confirm/cancel for pending writes, or pass through to agent.
     System message is prepended in run_agent() to guarantee correct ordering.
     """
-    messages = list(state.get("messages", []))
+    messages = state.get("messages", [])
+
+    # Detect language once per turn; downstream nodes read it off the state
+    # instead of re-scanning the message history. Prefer the hint from
+    # _build_input_state — it saw the user text before the food-name
+    # pre-pass rewrote any Chinese names stored in history.
+    user_lang = state.get("user_lang") or _detect_language(messages)
 
     # Check if this is a confirmation of pending writes
     pending_writes = state.get("pending_writes")
     if pending_writes and messages:
         last_msg = messages[-1]
         raw_content = last_msg.content if hasattr(last_msg, "content") else str(last_msg)
-        last_content = _extract_text(raw_content).lower().strip()
+        lowered = _extract_text(raw_content).lower()
+        last_content = lowered.translate(_STRIP_PUNCT)
 
-        # Check for explicit confirmation
-        confirm_words = {"confirm", "yes", "y", "ok", "是", "好", "可以", "行", "嗯", "对", "确认", "确定", "执行"}
-        cancel_words = {"cancel", "no", "n", "否", "不", "取消", "算了", "不要了", "不执行"}
-        negation_patterns = ["不对", "不是", "不行", "错了", "wrong", "not right", "wait"]
-
-        # Check negation first (higher priority)
-        if any(neg in last_content for neg in negation_patterns):
-            user_lang = _detect_language(messages)
+        # Check negation first (higher priority) — on the pre-stripped text,
+        # since "not right" contains a space that _STRIP_PUNCT removes.
+        if _NEGATION_RE.search(lowered):
             cancel_msg = "OK, cancelled. Please tell me the correct operation." if user_lang == "en" else "好的，已取消。请重新告诉我正确的操作。"
             return {
                 "pending_writes": None,
                 "status": "completed",
                 "response": cancel_msg,
+                "user_lang": user_lang,
             }
 
-        if last_content in confirm_words:
+        if last_content in _CONFIRM_WORDS:
             # Route to execute_write — keep pending_writes, set status
-            return {"status": "confirmed"}
+            return {"status": "confirmed", "user_lang": user_lang}
 
-        if last_content in cancel_words:
-            user_lang = _detect_language(messages)
+        if last_content in _CANCEL_WORDS:
             cancel_msg = "OK, operation cancelled. Anything else I can help with?" if user_lang == "en" else "好的，已取消操作。还有什么需要帮忙的吗？"
             return {
                 "pending_writes": None,
                 "status": "completed",
                 "response": cancel_msg,
+                "user_lang": user_lang,
             }
 
         # Fix 4: User sent a new request while pending — discard with feedback
-        user_lang = _detect_language(messages)
         from langchain_core.messages import AIMessage as _AIMsg
         discard_msg = "Previous pending operation discarded. Processing your new request." if user_lang == "en" else "已取消之前的待确认操作，正在处理你的新请求。"
         return {
             "messages": [_AIMsg(content=discard_msg)],
             "pending_writes": None,
             "status": "processing",
+            "user_lang": user_lang,
         }
 
-    return {"pending_writes": None, "status": "processing"}
+    return {"pending_writes": None, "status": "processing", "user_lang": user_lang}
 
 
 # ============ Node: agent_node ============
@@ -153,7 +244,7 @@ def _trim_messages(messages: list) -> list:
     system_msgs = []
     other_msgs = []
     for m in messages:
-        role = getattr(m, "type", None) or (m.get("role") if isinstance(m, dict) else None)
+        role, _ = _msg_type_content(m)
         if role == "system":
             system_msgs.append(m)
         else:
@@ -187,6 +278,52 @@ def _tag_cache_control(messages: list) -> list:
     return out
 
 
+# ---- Inventory prefetch ----
+#
+# After a search_inventory read the next LLM decision is very often a
+# consume/update, whose preview needs get_inventory_grouped(). Kick that
+# query off on a worker thread while the LLM call is in flight so the DB
+# round trip hides behind LLM latency. Entries are consumed at most once
+# and carry a short TTL so previews never act on a stale snapshot.
+_PREFETCH_TTL = 10  # seconds
+_PREFETCH_MAX = 256  # hard cap so abandoned prefetches can't accumulate
+_prefetch_executor = ThreadPoolExecutor(max_workers=2)
+_prefetch_lock = threading.Lock()
+_inventory_prefetch: dict[str, tuple[Future, float]] = {}
+
+
+def _start_inventory_prefetch(user_id: str) -> None:
+    """Warm get_inventory_grouped(user_id) in the background."""
+    ctx = contextvars.copy_context()  # carry the request's auth token
+    future = _prefetch_executor.submit(ctx.run, get_inventory_grouped, user_id)
+    now = time.monotonic()
+    with _prefetch_lock:
+        # Sweep expired entries on insert — a user who searches but never
+        # reaches a consume preview would otherwise pin a snapshot forever.
+        expired = [k for k, (_, deadline) in _inventory_prefetch.items() if deadline <= now]
+        for k in expired:
+            _inventory_prefetch.pop(k)[0].cancel()
+        if len(_inventory_prefetch) >= _PREFETCH_MAX:
+            _inventory_prefetch.clear()
+        _inventory_prefetch[user_id] = (future, now + _PREFETCH_TTL)
+
+
+def _take_inventory_prefetch(user_id: str):
+    """Return a prefetched inventory snapshot, or None if absent/stale/failed."""
+    with _prefetch_lock:
+        entry = _inventory_prefetch.pop(user_id, None)
+    if entry is None:
+        return None
+    future, deadline = entry
+    if time.monotonic() > deadline:
+        future.cancel()
+        return None
+    try:
+        return future.result(timeout=5)
+    except Exception:
+        return None
+
+
 def agent_node(state: AgentState) -> dict:
     """
     Call the LLM with bound tools. The LLM decides what to do:
@@ -198,6 +335,12 @@ def agent_node(state: AgentState) -> dict:
     messages = _trim_messages(state.get("messages", []))
     messages = _tag_cache_control(messages)
 
+    # If the agent just searched inventory, a write preview is the likely
+    # next step — prefetch the grouped inventory it will need.
+    log = state.get("tool_calls_log") or []
+    if user_id and any(entry.get("tool") == "search_inventory" for entry in log[-3:]):
+        _start_inventory_prefetch(user_id)
+
     llm = get_user_llm(user_id)
     llm_with_tools = llm.bind_tools(ALL_TOOLS)
 
@@ -227,14 +370,15 @@ def route_agent(state: AgentState) -> str:
 
     # Check if it's an AIMessage with tool calls
     if isinstance(last_message, AIMessage) and last_message.tool_calls:
-        tool_names = {tc["name"] for tc in last_message.tool_calls}
-
-        # If any write tools, route to preview
-        if tool_names & WRITE_TOOLS:
-            return "build_preview"
-
-        # If only read tools, execute them
-        if tool_names & READ_TOOLS:
+        # One pass, one dict lookup per call; any write tool routes to preview
+        saw_read = False
+        for tc in last_message.tool_calls:
+            kind = TOOL_KIND.get(tc["name"])
+            if kind == "write":
+                return "build_preview"
+            if kind == "read":
+                saw_read = True
+        if saw_read:
             return "execute_read"
 
     return "respond"
@@ -242,111 +386,136 @@ def route_agent(state: AgentState) -> str:
 
 # ============ Node: execute_read_tools ============
 
-def execute_read_tools(state: AgentState) -> dict:
-    """Execute read tool calls and return results as ToolMessages."""
-    messages = state.get("messages", [])
-    user_id = state.get("user_id", "")
-    tool_calls_log = list(state.get("tool_calls_log", []))
+# Read tools are independent I/O-bound lookups; when the LLM requests several
+# in one turn they run concurrently on a small worker pool.
+_READ_TOOL_WORKERS = 4
 
-    last_message = messages[-1]
-    if not isinstance(last_message, AIMessage) or not last_message.tool_calls:
-        return {}
 
-    tool_messages = []
+def _dispatch_read_tool(tool_name: str, args: dict, user_id: str) -> Any:
+    """Execute a single read tool call and return its raw result."""
+    if tool_name == "search_inventory":
+        return search_inventory(
+            user_id=user_id,
+            item_name=args.get("item_name"),
+            brand=args.get("brand"),
+            location=args.get("location"),
+        )
 
-    for tc in last_message.tool_calls:
-        tool_name = tc["name"]
-        args = tc["args"]
+    if tool_name == "get_batch_details":
+        from id_codec import encode_inventory_row
+        supabase = get_supabase_client()
+        real_id = decode_or_int(args["batch_id"])
+        fetch = (
+            supabase.table("inventory")
+            .select("*")
+            .eq("id", real_id)
+            .eq("user_id", user_id)
+            .execute()
+        )
+        return encode_inventory_row(fetch.data[0]) if fetch.data else None
+
+    if tool_name == "get_shopping_list":
+        from services import get_shopping_items
+        return get_shopping_items(user_id=user_id)
+
+    if tool_name == "search_saved_recipes":
+        from services import get_saved_recipes as _get_saved_recipes
+        query = args.get("query", "").strip().lower()
+        all_recipes = _get_saved_recipes(user_id, limit=50, offset=0)
+        if query:
+            filtered = [
+                r for r in all_recipes
+                if query in r.get("title", "").lower()
+                or any(query in (t or "").lower() for t in (r.get("tags") or []))
+            ]
+        else:
+            filtered = all_recipes[:10]
+        return [
+            {"id": r["id"], "title": r["title"], "tags": r.get("tags", []),
+             "cook_time_min": r.get("cook_time_min")}
+            for r in filtered
+        ]
+
+    if tool_name == "get_recipe_details":
+        from services import get_saved_recipe as _get_saved_recipe
+        real_rid = decode_or_int(args["recipe_id"])
+        recipe = _get_saved_recipe(user_id, real_rid)
+        return recipe if recipe else {"error": f"Recipe {args['recipe_id']} not found"}
+
+    if tool_name == "get_meals":
+        from services import get_meals as _get_meals
+        return _get_meals(
+            user_id=user_id,
+            date_from=args.get("date_from"),
+            date_to=args.get("date_to"),
+        )
 
-        print(f"[READ TOOL] {tool_name}({args})")
+    if tool_name == "get_meal_details":
+        from services import get_meal as _get_meal
+        real_mid = decode_or_int(args["meal_id"])
+        meal = _get_meal(user_id, real_mid)
+        return meal if meal else {"error": f"Meal {args['meal_id']} not found"}
 
-        try:
-            if tool_name == "search_inventory":
-                result = search_inventory(
-                    user_id=user_id,
-                    item_name=args.get("item_name"),
-                    brand=args.get("brand"),
-                    location=args.get("location"),
-                )
-            elif tool_name == "get_batch_details":
-                from id_codec import encode_inventory_row
-                supabase = get_supabase_client()
-                real_id = decode_or_int(args["batch_id"])
-                fetch = (
-                    supabase.table("inventory")
-                    .select("*")
-                    .eq("id", real_id)
-                    .eq("user_id", user_id)
-                    .execute()
-                )
-                result = encode_inventory_row(fetch.data[0]) if fetch.data else None
-            elif tool_name == "get_shopping_list":
-                from services import get_shopping_items
-                result = get_shopping_items(user_id=state["user_id"])
-
-            elif tool_name == "search_saved_recipes":
-                from services import get_saved_recipes as _get_saved_recipes
-                query = args.get("query", "").strip().lower()
-                all_recipes = _get_saved_recipes(user_id, limit=50, offset=0)
-                if query:
-                    filtered = [
-                        r for r in all_recipes
-                        if query in r.get("title", "").lower()
-                        or any(query in (t or "").lower() for t in (r.get("tags") or []))
-                    ]
-                else:
-                    filtered = all_recipes[:10]
-                result = [
-                    {"id": r["id"], "title": r["title"], "tags": r.get("tags", []),
-                     "cook_time_min": r.get("cook_time_min")}
-                    for r in filtered
-                ]
-
-            elif tool_name == "get_recipe_details":
-                from services import get_saved_recipe as _get_saved_recipe
-                real_rid = decode_or_int(args["recipe_id"])
-                recipe = _get_saved_recipe(user_id, real_rid)
-                if recipe:
-                    result = recipe
-                else:
-                    result = {"error": f"Recipe {args['recipe_id']} not found"}
+    return f"Unknown read tool: {tool_name}"
 
-            elif tool_name == "get_meals":
-                from services import get_meals as _get_meals
-                result = _get_meals(
-                    user_id=user_id,
-                    date_from=args.get("date_from"),
-                    date_to=args.get("date_to"),
-                )
 
-            elif tool_name == "get_meal_details":
-                from services import get_meal as _get_meal
-                real_mid = decode_or_int(args["meal_id"])
-                meal = _get_meal(user_id, real_mid)
-                if meal:
-                    result = meal
-                else:
-                    result = {"error": f"Meal {args['meal_id']} not found"}
+def _run_read_tool(tc: dict, user_id: str) -> Any:
+    """Run one read tool call, capturing errors as string results."""
+    tool_name = tc["name"]
+    args = tc["args"]
 
-            else:
-                result = f"Unknown read tool: {tool_name}"
+    logger.debug("[READ TOOL] %s(%s)", tool_name, args)
 
-            print(f"[READ RESULT] {tool_name}: {json.dumps(result, default=str)[:200]}")
+    try:
+        result = _dispatch_read_tool(tool_name, args, user_id)
+        if logger.isEnabledFor(logging.DEBUG):
+            # Serializing the result is only worth it when DEBUG is on
+            logger.debug("[READ RESULT] %s: %s", tool_name,
+                         orjson.dumps(result, default=str)[:200].decode(errors="replace"))
+    except Exception as e:
+        result = f"Error executing {tool_name}: {str(e)}"
+        logger.warning("[READ ERROR] %s: %s", tool_name, e)
 
-        except Exception as e:
-            result = f"Error executing {tool_name}: {str(e)}"
-            print(f"[READ ERROR] {tool_name}: {e}")
+    return result
+
+
+def execute_read_tools(state: AgentState) -> dict:
+    """Execute read tool calls (in parallel when independent) and return
+    results as ToolMessages."""
+    messages = state.get("messages", [])
+    user_id = state.get("user_id", "")
+
+    last_message = messages[-1]
+    if not isinstance(last_message, AIMessage) or not last_message.tool_calls:
+        return {}
 
+    tool_calls = last_message.tool_calls
+
+    if len(tool_calls) == 1:
+        results = [_run_read_tool(tool_calls[0], user_id)]
+    else:
+        # Fan out across threads; copy_context propagates the per-request
+        # Supabase auth token (a contextvar) into each worker.
+        with ThreadPoolExecutor(max_workers=min(len(tool_calls), _READ_TOOL_WORKERS)) as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, _run_read_tool, tc, user_id)
+                for tc in tool_calls
+            ]
+            results = [f.result() for f in futures]
+
+    tool_messages = []
+    new_log_entries = []
+    for tc, result in zip(tool_calls, results):
         tool_messages.append(
-            ToolMessage(content=json.dumps(result, default=str), tool_call_id=tc["id"])
+            ToolMessage(content=orjson.dumps(result, default=str).decode(), tool_call_id=tc["id"])
         )
-        tool_calls_log.append({
-            "tool": tool_name,
-            "args": args,
+        new_log_entries.append({
+            "tool": tc["name"],
+            "args": tc["args"],
             "result": "success" if not isinstance(result, str) or not result.startswith("Error") else "error",
         })
 
-    return {"messages": tool_messages, "tool_calls_log": tool_calls_log}
+    return {"messages": tool_messages, "tool_calls_log": new_log_entries}
 
 
 # ============ Node: build_preview ============
@@ -358,7 +527,7 @@ def build_write_preview(state: AgentState) -> dict:
     """
     messages = state.get("messages", [])
     user_id = state.get("user_id", "")
-    user_lang = _detect_language(messages)
+    user_lang = state.get("user_lang") or _detect_language(messages)
 
     last_message = messages[-1]
     if not isinstance(last_message, AIMessage) or not last_message.tool_calls:
@@ -367,133 +536,42 @@ def build_write_preview(state: AgentState) -> dict:
     pending_writes = []
     preview_parts = []
 
+    # Fetch every batch row referenced by discard/update calls in one query
+    # instead of one round trip per tool call.
+    batch_rows = _fetch_batch_rows(user_id, last_message.tool_calls)
+
+    # Inventory snapshots fetched while previewing this turn; several
+    # consume_item calls in one preview share them instead of refetching.
+    inv_memo: dict[tuple[str, str], list] = {}
+
     for i, tc in enumerate(last_message.tool_calls):
         tool_name = tc["name"]
         args = tc["args"]
 
-        print(f"[PREVIEW] {tool_name}({args})")
+        logger.debug("[PREVIEW] %s(%s)", tool_name, args)
+
+        fefo_plan = None
 
         if tool_name == "add_item":
             preview = _preview_add(args, user_lang)
         elif tool_name == "consume_item":
-            preview = _preview_consume(args, user_id, user_lang)
+            preview, fefo_plan = _preview_consume(args, user_id, user_lang, inv_memo)
         elif tool_name == "discard_batch":
-            preview = _preview_discard(args, user_id, user_lang)
+            preview = _preview_discard(args, user_lang, batch_rows)
         elif tool_name == "update_item":
-            preview = _preview_update(args, user_id, user_lang)
-        elif tool_name == "add_to_shopping_list":
-            name = args.get("item_name", "?")
-            qty = args.get("quantity")
-            unit = args.get("unit", "")
-            note = args.get("note")
-            qty_str = f" {qty}{unit}" if qty else ""
-            note_str = f" — {note}" if note else ""
-            if user_lang == "zh":
-                preview = f"添加到购物清单: {name}{qty_str}{note_str}"
-            else:
-                preview = f"Add to shopping list: {name}{qty_str}{note_str}"
-
-        elif tool_name == "generate_recipes_tool":
-            n = args.get("count", 4)
-            cat_str = f" [{args.get('categories')}]" if args.get("categories") else ""
-            exp_str = " (prioritize expiring)" if args.get("use_expiring") else ""
-            set_str = " (meal set)" if args.get("as_meal_set") else ""
-            if user_lang == "zh":
-                preview = f'生成 {n} 个菜谱建议: "{args["prompt"]}"{cat_str}{exp_str}{set_str}'
-            else:
-                preview = f'Generate {n} recipe suggestions: "{args["prompt"]}"{cat_str}{exp_str}{set_str}'
-
-        elif tool_name == "save_recipe":
-            if user_lang == "zh":
-                preview = f'保存菜谱: "{args["recipe_title"]}"'
-            else:
-                preview = f'Save recipe: "{args["recipe_title"]}"'
-
-        elif tool_name == "save_all_recipes":
-            pending = state.get("pending_recipes") or []
-            if pending:
-                titles = ", ".join(r["title"] for r in pending)
-                if user_lang == "zh":
-                    preview = f"保存全部 {len(pending)} 道菜谱: {titles}"
-                else:
-                    preview = f"Save all {len(pending)} recipes: {titles}"
-            else:
-                if user_lang == "zh":
-                    preview = "没有待保存的菜谱"
-                else:
-                    preview = "No recipes to save"
-
-        elif tool_name == "delete_recipe":
-            from services import get_saved_recipe as _get_saved_recipe
-            recipe = _get_saved_recipe(user_id, decode_or_int(args["recipe_id"]))
-            title = recipe["title"] if recipe else args['recipe_id']
-            if user_lang == "zh":
-                preview = f'删除已保存的菜谱: "{title}"'
-            else:
-                preview = f'Delete saved recipe: "{title}"'
-
-        elif tool_name == "add_recipe_ingredients_to_shopping":
-            from services import get_saved_recipe as _get_saved_recipe
-            recipe = _get_saved_recipe(user_id, decode_or_int(args["recipe_id"]))
-            if recipe:
-                missing = [
-                    ing["name"] for ing in recipe.get("ingredients", [])
-                    if not ing.get("have_in_stock")
-                ]
-                items_str = ", ".join(missing[:5]) + ("..." if len(missing) > 5 else "")
-                if user_lang == "zh":
-                    preview = f'将 "{recipe["title"]}" 的 {len(missing)} 种缺少食材添加到购物清单: {items_str}'
-                else:
-                    preview = f'Add {len(missing)} missing ingredients from "{recipe["title"]}" to shopping list: {items_str}'
-            else:
-                if user_lang == "zh":
-                    preview = f"将菜谱 {args['recipe_id']} 的食材添加到购物清单"
-                else:
-                    preview = f"Add ingredients from recipe {args['recipe_id']} to shopping list"
-
-        elif tool_name == "create_meal":
-            name = args.get("name", "?")
-            date_str = f", date: {args['scheduled_date']}" if args.get("scheduled_date") else ""
-            type_str = f" ({args['meal_type']})" if args.get("meal_type") else ""
-            ids_str = f", recipes: [{args['recipe_ids']}]" if args.get("recipe_ids") else ""
-            if user_lang == "zh":
-                preview = f"创建餐食: {name}{type_str}{date_str}{ids_str}"
-            else:
-                preview = f"Create meal: {name}{type_str}{date_str}{ids_str}"
-
-        elif tool_name == "add_recipes_to_meal":
-            from services import get_meal as _get_meal
-            meal = _get_meal(user_id, decode_or_int(args["meal_id"]))
-            meal_name = meal["name"] if meal else args['meal_id']
-            if user_lang == "zh":
-                preview = f"将菜谱 [{args['recipe_ids']}] 添加到餐食 \"{meal_name}\""
-            else:
-                preview = f"Add recipes [{args['recipe_ids']}] to meal \"{meal_name}\""
-
-        elif tool_name == "remove_recipe_from_meal":
-            from services import get_meal as _get_meal, get_saved_recipe as _gsr
-            meal = _get_meal(user_id, decode_or_int(args["meal_id"]))
-            recipe = _gsr(user_id, decode_or_int(args["recipe_id"]))
-            meal_name = meal["name"] if meal else args['meal_id']
-            recipe_title = recipe["title"] if recipe else args['recipe_id']
-            if user_lang == "zh":
-                preview = f"从餐食 \"{meal_name}\" 中移除菜谱 \"{recipe_title}\""
-            else:
-                preview = f"Remove \"{recipe_title}\" from meal \"{meal_name}\""
-
-        elif tool_name == "delete_meal":
-            from services import get_meal as _get_meal
-            meal = _get_meal(user_id, decode_or_int(args["meal_id"]))
-            meal_name = meal["name"] if meal else args['meal_id']
-            if user_lang == "zh":
-                preview = f"删除餐食: \"{meal_name}\""
-            else:
-                preview = f"Delete meal: \"{meal_name}\""
-
+            preview = _preview_update(args, user_lang, batch_rows)
         else:
-            preview = f"Unknown write tool: {tool_name}"
+            builder = _PREVIEW_BUILDERS.get(tool_name)
+            if builder is not None:
+                preview = builder(args, user_id, user_lang, state)
+            else:
+                preview = f"Unknown write tool: {tool_name}"
 
-        pending_writes.append({"tool": tool_name, "args": args, "tool_call_id": tc["id"]})
+        pw: dict[str, Any] = {"tool": tool_name, "args": args, "tool_call_id": tc["id"]}
+        if fefo_plan:
+            # Reused at execution so confirm doesn't re-query and re-sort
+            pw["plan"] = fefo_plan
+        pending_writes.append(pw)
         preview_parts.append(f"{i + 1}. {preview}")
 
     # Build confirmation message
@@ -525,104 +603,114 @@ def build_write_preview(state: AgentState) -> dict:
     }
 
 
-def _preview_add(args: dict, lang: str) -> str:
-    """Build preview text for add_item."""
-    name = args.get("item_name", "?")
-    qty = args.get("quantity", "?")
-    unit = args.get("unit", "?")
-    loc = args.get("location", "?")
-    brand = f" ({args['brand']})" if args.get("brand") else ""
-    expiry = f", expires {args['expiry_date']}" if args.get("expiry_date") else ""
-    cat = f", category: {args['category']}" if args.get("category") else ""
+# Per-language templates for add_item: pick the format string once per call
+# instead of branching on the language around each optional fragment.
+_ADD_PREVIEW_TEMPLATES = {
+    "zh": "添加: {qty}{unit} {name}{brand}, 位置: {loc}{expiry}{cat}",
+    "en": "Add: {qty}{unit} {name}{brand}, location: {loc}{expiry}{cat}",
+}
+_ADD_RESULT_TEMPLATES = {
+    "zh": "已添加: {qty}{unit} {name}{brand}\n   Batch {bid}, 位置: {loc}{expiry}",
+    "en": "Added: {qty}{unit} {name}{brand}\n   Batch {bid}, Location: {loc}{expiry}",
+}
+_EXPIRY_LABELS = {"zh": "过期日", "en": "Expires"}
 
-    if lang == "zh":
-        return f"添加: {qty}{unit} {name}{brand}, 位置: {loc}{expiry}{cat}"
-    return f"Add: {qty}{unit} {name}{brand}, location: {loc}{expiry}{cat}"
 
-
-def _preview_consume(args: dict, user_id: str, lang: str) -> str:
-    """Build preview text for consume_item with FEFO plan."""
+def _preview_add(args: dict, lang: str) -> str:
+    """Build preview text for add_item."""
+    return _ADD_PREVIEW_TEMPLATES[lang].format_map({
+        "name": args.get("item_name", "?"),
+        "qty": args.get("quantity", "?"),
+        "unit": args.get("unit", "?"),
+        "loc": args.get("location", "?"),
+        "brand": f" ({args['brand']})" if args.get("brand") else "",
+        "expiry": f", expires {args['expiry_date']}" if args.get("expiry_date") else "",
+        "cat": f", category: {args['category']}" if args.get("category") else "",
+    })
+
+
+def _preview_consume(args: dict, user_id: str, lang: str,
+                     inv_memo: dict | None = None) -> tuple[str, list[dict]]:
+    """Build preview text for consume_item; returns (text, FEFO plan)."""
     name = args.get("item_name", "?")
     amount = args.get("amount", 0)
     brand = args.get("brand")
     unit = args.get("unit", "")
 
     # Calculate FEFO plan
-    plan = _calculate_fefo_plan(user_id, name, amount, brand)
+    plan = _calculate_fefo_plan(user_id, name, amount, brand, memo=inv_memo)
 
     if not plan:
         if lang == "zh":
-            return f"消耗: {amount}{unit} {name} - 未找到匹配的库存"
-        return f"Consume: {amount}{unit} {name} - no matching inventory found"
-
-    if lang == "zh":
-        lines = [f"消耗: {amount}{unit} {name}"]
-        for batch in plan:
-            brand_str = f" ({batch.get('brand')})" if batch.get("brand") else ""
-            lines.append(
-                f"   Batch {batch['batch_id']}{brand_str}: "
-                f"{batch['current_quantity']} -> {batch['new_quantity']}, "
-                f"过期: {batch.get('expiry_date', 'N/A')}"
-            )
-        return "\n".join(lines)
-    else:
-        lines = [f"Consume: {amount}{unit} {name}"]
-        for batch in plan:
-            brand_str = f" ({batch.get('brand')})" if batch.get("brand") else ""
-            lines.append(
-                f"   Batch {batch['batch_id']}{brand_str}: "
-                f"{batch['current_quantity']} -> {batch['new_quantity']}, "
-                f"expires: {batch.get('expiry_date', 'N/A')}"
-            )
-        return "\n".join(lines)
-
-
-def _preview_discard(args: dict, user_id: str, lang: str) -> str:
-    """Build preview text for discard_batch."""
-    batch_id = args.get("batch_id", "?")
+            return f"消耗: {amount}{unit} {name} - 未找到匹配的库存", plan
+        return f"Consume: {amount}{unit} {name} - no matching inventory found", plan
+
+    # Single loop; only the labels differ between languages
+    verb, expiry_label = ("消耗", "过期") if lang == "zh" else ("Consume", "expires")
+    lines = [f"{verb}: {amount}{unit} {name}"]
+    for batch in plan:
+        brand_str = f" ({batch.get('brand')})" if batch.get("brand") else ""
+        lines.append(
+            f"   Batch {batch['batch_id']}{brand_str}: "
+            f"{batch['current_quantity']} -> {batch['new_quantity']}, "
+            f"{expiry_label}: {batch.get('expiry_date', 'N/A')}"
+        )
+    return "\n".join(lines), plan
+
+
+def _fetch_batch_rows(user_id: str, tool_calls: list) -> dict[int, dict]:
+    """Fetch all batch rows referenced by discard/update tool calls at once."""
+    ids = []
+    for tc in tool_calls:
+        if tc["name"] in ("discard_batch", "update_item"):
+            batch_id = tc["args"].get("batch_id")
+            if batch_id:
+                ids.append(decode_or_int(batch_id))
+    if not ids:
+        return {}
 
     supabase = get_supabase_client()
-    real_id = decode_or_int(batch_id) if batch_id != "?" else batch_id
+    # Only the columns the previews render / diff against — not the full row
     fetch = (
         supabase.table("inventory")
-        .select("*")
-        .eq("id", real_id)
+        .select("id,item_name,quantity,unit,brand,location,expiry_date,is_open,category")
+        .in_("id", ids)
         .eq("user_id", user_id)
         .execute()
     )
+    return {row["id"]: row for row in fetch.data}
+
 
-    if not fetch.data:
+def _preview_discard(args: dict, lang: str, batch_rows: dict[int, dict]) -> str:
+    """Build preview text for discard_batch."""
+    batch_id = args.get("batch_id", "?")
+
+    real_id = decode_or_int(batch_id) if batch_id != "?" else batch_id
+    item = batch_rows.get(real_id)
+
+    if not item:
         if lang == "zh":
             return f"丢弃: Batch {batch_id} - 未找到"
         return f"Discard: Batch {batch_id} - not found"
 
-    item = fetch.data[0]
     if lang == "zh":
         return f"丢弃: Batch {batch_id} - {item['item_name']} ({item['quantity']}{item['unit']})"
     return f"Discard: Batch {batch_id} - {item['item_name']} ({item['quantity']}{item['unit']})"
 
 
-def _preview_update(args: dict, user_id: str, lang: str) -> str:
+def _preview_update(args: dict, lang: str, batch_rows: dict[int, dict]) -> str:
     """Build preview text for update_item."""
     batch_id = args.get("batch_id", "?")
     updates = {k: v for k, v in args.items() if k != "batch_id" and v is not None}
 
-    supabase = get_supabase_client()
     real_id = decode_or_int(batch_id) if batch_id != "?" else batch_id
-    fetch = (
-        supabase.table("inventory")
-        .select("*")
-        .eq("id", real_id)
-        .eq("user_id", user_id)
-        .execute()
-    )
+    item = batch_rows.get(real_id)
 
-    if not fetch.data:
+    if not item:
         if lang == "zh":
             return f"更新: Batch {batch_id} - 未找到"
         return f"Update: Batch {batch_id} - not found"
 
-    item = fetch.data[0]
     changes = []
     for key, new_val in updates.items():
         old_val = item.get(key, "?")
@@ -634,32 +722,166 @@ def _preview_update(args: dict, user_id: str, lang: str) -> str:
     return f"Update: {item['item_name']} (Batch {batch_id}) - {changes_str}"
 
 
+def _preview_add_to_shopping(args: dict, user_id: str, lang: str, state: AgentState) -> str:
+    name = args.get("item_name", "?")
+    qty = args.get("quantity")
+    unit = args.get("unit", "")
+    note = args.get("note")
+    qty_str = f" {qty}{unit}" if qty else ""
+    note_str = f" — {note}" if note else ""
+    if lang == "zh":
+        return f"添加到购物清单: {name}{qty_str}{note_str}"
+    return f"Add to shopping list: {name}{qty_str}{note_str}"
+
+
+def _preview_generate_recipes(args: dict, user_id: str, lang: str, state: AgentState) -> str:
+    n = args.get("count", 4)
+    cat_str = f" [{args.get('categories')}]" if args.get("categories") else ""
+    exp_str = " (prioritize expiring)" if args.get("use_expiring") else ""
+    set_str = " (meal set)" if args.get("as_meal_set") else ""
+    if lang == "zh":
+        return f'生成 {n} 个菜谱建议: "{args["prompt"]}"{cat_str}{exp_str}{set_str}'
+    return f'Generate {n} recipe suggestions: "{args["prompt"]}"{cat_str}{exp_str}{set_str}'
+
+
+def _preview_save_recipe(args: dict, user_id: str, lang: str, state: AgentState) -> str:
+    if lang == "zh":
+        return f'保存菜谱: "{args["recipe_title"]}"'
+    return f'Save recipe: "{args["recipe_title"]}"'
+
+
+def _preview_save_all_recipes(args: dict, user_id: str, lang: str, state: AgentState) -> str:
+    pending = state.get("pending_recipes") or []
+    if pending:
+        titles = ", ".join(r["title"] for r in pending)
+        if lang == "zh":
+            return f"保存全部 {len(pending)} 道菜谱: {titles}"
+        return f"Save all {len(pending)} recipes: {titles}"
+    if lang == "zh":
+        return "没有待保存的菜谱"
+    return "No recipes to save"
+
+
+def _preview_delete_recipe(args: dict, user_id: str, lang: str, state: AgentState) -> str:
+    from services import get_saved_recipe as _get_saved_recipe
+    recipe = _get_saved_recipe(user_id, decode_or_int(args["recipe_id"]))
+    title = recipe["title"] if recipe else args['recipe_id']
+    if lang == "zh":
+        return f'删除已保存的菜谱: "{title}"'
+    return f'Delete saved recipe: "{title}"'
+
+
+def _preview_recipe_to_shopping(args: dict, user_id: str, lang: str, state: AgentState) -> str:
+    from services import get_saved_recipe as _get_saved_recipe
+    recipe = _get_saved_recipe(user_id, decode_or_int(args["recipe_id"]))
+    if recipe:
+        missing = [
+            ing["name"] for ing in recipe.get("ingredients", [])
+            if not ing.get("have_in_stock")
+        ]
+        items_str = ", ".join(missing[:5]) + ("..." if len(missing) > 5 else "")
+        if lang == "zh":
+            return f'将 "{recipe["title"]}" 的 {len(missing)} 种缺少食材添加到购物清单: {items_str}'
+        return f'Add {len(missing)} missing ingredients from "{recipe["title"]}" to shopping list: {items_str}'
+    if lang == "zh":
+        return f"将菜谱 {args['recipe_id']} 的食材添加到购物清单"
+    return f"Add ingredients from recipe {args['recipe_id']} to shopping list"
+
+
+def _preview_create_meal(args: dict, user_id: str, lang: str, state: AgentState) -> str:
+    name = args.get("name", "?")
+    date_str = f", date: {args['scheduled_date']}" if args.get("scheduled_date") else ""
+    type_str = f" ({args['meal_type']})" if args.get("meal_type") else ""
+    ids_str = f", recipes: [{args['recipe_ids']}]" if args.get("recipe_ids") else ""
+    if lang == "zh":
+        return f"创建餐食: {name}{type_str}{date_str}{ids_str}"
+    return f"Create meal: {name}{type_str}{date_str}{ids_str}"
+
+
+def _preview_add_recipes_to_meal(args: dict, user_id: str, lang: str, state: AgentState) -> str:
+    from services import get_meal as _get_meal
+    meal = _get_meal(user_id, decode_or_int(args["meal_id"]))
+    meal_name = meal["name"] if meal else args['meal_id']
+    if lang == "zh":
+        return f"将菜谱 [{args['recipe_ids']}] 添加到餐食 \"{meal_name}\""
+    return f"Add recipes [{args['recipe_ids']}] to meal \"{meal_name}\""
+
+
+def _preview_remove_recipe_from_meal(args: dict, user_id: str, lang: str, state: AgentState) -> str:
+    from services import get_meal as _get_meal, get_saved_recipe as _gsr
+    meal = _get_meal(user_id, decode_or_int(args["meal_id"]))
+    recipe = _gsr(user_id, decode_or_int(args["recipe_id"]))
+    meal_name = meal["name"] if meal else args['meal_id']
+    recipe_title = recipe["title"] if recipe else args['recipe_id']
+    if lang == "zh":
+        return f"从餐食 \"{meal_name}\" 中移除菜谱 \"{recipe_title}\""
+    return f"Remove \"{recipe_title}\" from meal \"{meal_name}\""
+
+
+def _preview_delete_meal(args: dict, user_id: str, lang: str, state: AgentState) -> str:
+    from services import get_meal as _get_meal
+    meal = _get_meal(user_id, decode_or_int(args["meal_id"]))
+    meal_name = meal["name"] if meal else args['meal_id']
+    if lang == "zh":
+        return f"删除餐食: \"{meal_name}\""
+    return f"Delete meal: \"{meal_name}\""
+
+
+# Uniform-signature preview builders, dispatched by tool name. The four
+# inventory tools stay in the explicit chain in build_write_preview because
+# they need extra context (batch rows, the per-turn inventory memo, and
+# consume's FEFO plan return).
+_PREVIEW_BUILDERS = {
+    "add_to_shopping_list": _preview_add_to_shopping,
+    "generate_recipes_tool": _preview_generate_recipes,
+    "save_recipe": _preview_save_recipe,
+    "save_all_recipes": _preview_save_all_recipes,
+    "delete_recipe": _preview_delete_recipe,
+    "add_recipe_ingredients_to_shopping": _preview_recipe_to_shopping,
+    "create_meal": _preview_create_meal,
+    "add_recipes_to_meal": _preview_add_recipes_to_meal,
+    "remove_recipe_from_meal": _preview_remove_recipe_from_meal,
+    "delete_meal": _preview_delete_meal,
+}
+
+
 def _calculate_fefo_plan(
     user_id: str,
     item_name: str,
     amount: float,
     brand: str | None,
+    memo: dict | None = None,
 ) -> list[dict]:
-    """Calculate FEFO deduction plan without executing."""
-    groups = get_inventory_grouped(user_id)
-
-    target_group = None
-    for group in groups:
-        if group.item_name.lower() == item_name.lower():
-            target_group = group
-            break
+    """Calculate FEFO deduction plan without executing.
 
+    ``memo`` is an optional per-turn cache keyed by (user_id, item name) so
+    repeated plans within one preview reuse the same snapshot.
+    """
+    memo_key = (user_id, item_name.lower())
+    groups = memo.get(memo_key) if memo is not None else None
+    if groups is None:
+        groups = _take_inventory_prefetch(user_id)
+    if groups is None:
+        # No warm snapshot — fetch just the item we need, filtered server-side
+        groups = get_inventory_grouped(user_id, item_name=item_name)
+    if memo is not None:
+        memo[memo_key] = groups
+
+    target_group = {g.item_name.lower(): g for g in groups}.get(item_name.lower())
     if not target_group:
         return []
 
     batches = target_group.batches
     if brand:
-        batches = [b for b in batches if b.brand and b.brand.lower() == brand.lower()]
+        brand_lc = brand.lower()
+        batches = [b for b in batches if b.brand and b.brand.lower() == brand_lc]
 
-    batches = sorted(
-        batches,
-        key=lambda b: (not b.is_open, b.expiry_date or date.max),
-    )
+    # Decorate-sort-undecorate: compute each batch's sort key (open first,
+    # then earliest expiry) once up front rather than via a lambda.
+    decorated = [(0 if b.is_open else 1, b.expiry_date or date.max, i, b)
+                 for i, b in enumerate(batches)]
+    decorated.sort(key=operator.itemgetter(0, 1, 2))
+    batches = [entry[3] for entry in decorated]
 
     plan = []
     remaining = amount
@@ -687,23 +909,13 @@ def execute_write_tools(state: AgentState) -> dict:
     pending_writes = state.get("pending_writes", [])
     user_id = state.get("user_id", "")
     messages = state.get("messages", [])
-    user_lang = _detect_language(messages)
-    tool_calls_log = list(state.get("tool_calls_log", []))
-
-    # Extract the most recent user message that triggered this action (not a confirmation).
-    # Iterate in reverse so multi-turn conversations pick the latest substantive input,
-    # not an old query from earlier in the thread.
-    raw_input = ""
-    skip_words = {
-        "confirm", "cancel", "yes", "no", "y", "n", "ok",
-        "是", "好", "确认", "确定", "执行", "否", "不", "取消", "算了",
-    }
-    for msg in reversed(messages):
-        content = _extract_text(msg.content if hasattr(msg, "content") else str(msg))
-        msg_type = getattr(msg, "type", None) or (msg.get("role") if isinstance(msg, dict) else None)
-        if msg_type in ("human", "user") and content.strip().lower() not in skip_words:
-            raw_input = content
-            break
+    user_lang = state.get("user_lang") or _detect_language(messages)
+    new_log_entries: list[dict[str, Any]] = []
+
+    # Extract the most recent user message that triggered this action (not a
+    # confirmation), so multi-turn conversations pick the latest substantive
+    # input rather than an old query from earlier in the thread.
+    raw_input = _latest_human_content(messages)
 
     results = []
     new_pending_recipes = None
@@ -712,13 +924,13 @@ def execute_write_tools(state: AgentState) -> dict:
         tool_name = pw["tool"]
         args = pw["args"]
 
-        print(f"[EXECUTE] {tool_name}({args})")
+        logger.debug("[EXECUTE] %s(%s)", tool_name, args)
 
         try:
             if tool_name == "add_item":
                 result_text = _execute_add(user_id, args, user_lang, raw_input)
             elif tool_name == "consume_item":
-                result_text = _execute_consume(user_id, args, user_lang, raw_input)
+                result_text = _execute_consume(user_id, args, user_lang, raw_input, plan=pw.get("plan"))
             elif tool_name == "discard_batch":
                 result_text = _execute_discard(user_id, args, user_lang, raw_input)
             elif tool_name == "update_item":
@@ -897,7 +1109,7 @@ def execute_write_tools(state: AgentState) -> dict:
                 result_text = f"Unknown tool: {tool_name}"
 
             results.append(result_text)
-            tool_calls_log.append({
+            new_log_entries.append({
                 "tool": tool_name,
                 "args": args,
                 "result": "success",
@@ -906,7 +1118,7 @@ def execute_write_tools(state: AgentState) -> dict:
         except Exception as e:
             error_msg = f"Operation failed: {str(e)}" if user_lang == "en" else f"操作失败: {str(e)}"
             results.append(error_msg)
-            tool_calls_log.append({
+            new_log_entries.append({
                 "tool": tool_name,
                 "args": args,
                 "result": f"error: {str(e)}",
@@ -919,7 +1131,7 @@ def execute_write_tools(state: AgentState) -> dict:
         "pending_writes": None,
         "status": "completed",
         "response": combined,
-        "tool_calls_log": tool_calls_log,
+        "tool_calls_log": new_log_entries,
     }
     if new_pending_recipes is not None:
         update["pending_recipes"] = new_pending_recipes
@@ -951,25 +1163,19 @@ def _execute_add(user_id: str, args: dict, lang: str, raw_input: str = "") -> st
 
     row = add_inventory_item(user_id, item_data, raw_input=raw_input or None, source="agent")
 
-    if lang == "zh":
-        msg = f"已添加: {row['quantity']}{row['unit']} {row['item_name']}"
-        if row.get("brand"):
-            msg += f" ({row['brand']})"
-        msg += f"\n   Batch {row['id']}, 位置: {row['location']}"
-        if row.get("expiry_date"):
-            msg += f", 过期日: {row['expiry_date']}"
-        return msg
-    else:
-        msg = f"Added: {row['quantity']}{row['unit']} {row['item_name']}"
-        if row.get("brand"):
-            msg += f" ({row['brand']})"
-        msg += f"\n   Batch {row['id']}, Location: {row['location']}"
-        if row.get("expiry_date"):
-            msg += f", Expires: {row['expiry_date']}"
-        return msg
+    return _ADD_RESULT_TEMPLATES[lang].format_map({
+        "name": row["item_name"],
+        "qty": row["quantity"],
+        "unit": row["unit"],
+        "bid": row["id"],
+        "loc": row["location"],
+        "brand": f" ({row['brand']})" if row.get("brand") else "",
+        "expiry": f", {_EXPIRY_LABELS[lang]}: {row['expiry_date']}" if row.get("expiry_date") else "",
+    })
 
 
-def _execute_consume(user_id: str, args: dict, lang: str, raw_input: str = "") -> str:
+def _execute_consume(user_id: str, args: dict, lang: str, raw_input: str = "",
+                     plan: list[dict] | None = None) -> str:
     """Execute consume_item operation."""
     result = svc_consume_item(
         user_id=user_id,
@@ -978,25 +1184,20 @@ def _execute_consume(user_id: str, args: dict, lang: str, raw_input: str = "") -
         brand=args.get("brand"),
         raw_input=raw_input or None,
         source="agent",
+        precomputed_plan=plan,
     )
 
     if not result.success:
         return result.message
 
     if lang == "zh":
-        msg = f"已消耗 {result.consumed_amount} {args.get('item_name')}\n"
-        msg += "扣除明细:\n"
-        for batch in result.affected_batches:
-            brand_str = f" ({batch.get('brand')})" if batch.get("brand") else ""
-            msg += f"   - Batch {batch['batch_id']}{brand_str}: {batch['old_quantity']} -> {batch['new_quantity']}\n"
-        return msg
+        parts = [f"已消耗 {result.consumed_amount} {args.get('item_name')}\n", "扣除明细:\n"]
     else:
-        msg = f"Consumed {result.consumed_amount} {args.get('item_name')}\n"
-        msg += "Deduction details:\n"
-        for batch in result.affected_batches:
-            brand_str = f" ({batch.get('brand')})" if batch.get("brand") else ""
-            msg += f"   - Batch {batch['batch_id']}{brand_str}: {batch['old_quantity']} -> {batch['new_quantity']}\n"
-        return msg
+        parts = [f"Consumed {result.consumed_amount} {args.get('item_name')}\n", "Deduction details:\n"]
+    for batch in result.affected_batches:
+        brand_str = f" ({batch.get('brand')})" if batch.get("brand") else ""
+        parts.append(f"   - Batch {batch['batch_id']}{brand_str}: {batch['old_quantity']} -> {batch['new_quantity']}\n")
+    return "".join(parts)
 
 
 def _execute_discard(user_id: str, args: dict, lang: str, raw_input: str = "") -> str:
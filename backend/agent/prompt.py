@@ -1,16 +1,14 @@
 """System prompt for the Kitchen Loop AI tool-calling agent."""
 
 from datetime import date
+from functools import lru_cache
 
-
-def get_system_prompt(user_language: str = "en") -> str:
-    """Build the system prompt with current date and user language."""
-    today = date.today().isoformat()
-
-    return f"""You are a smart kitchen inventory assistant. You help users manage their household grocery inventory through natural conversation.
-
-Today's date: {today}
-User's preferred language: {user_language}
+# The instruction body is a frozen module-level constant: it never changes at
+# runtime, so building a prompt is a small concatenation instead of a ~3KB
+# f-string render. Keeping the volatile session values (date, language) in a
+# short suffix also leaves the long prefix byte-identical across requests for
+# provider-side prompt caching.
+_STATIC_SYSTEM_PROMPT = """You are a smart kitchen inventory assistant. You help users manage their household grocery inventory through natural conversation.
 
 ## Your Tools
 
@@ -162,7 +160,7 @@ ALWAYS use English for all tool parameter values:
 Translate the user's language to English for tool calls, but respond in the user's language.
 
 ### Response Language
-Always respond in the user's preferred language ({user_language}). If the user writes in a different language, respond in the language they used.
+Always respond in the user's preferred language (stated under Session Context below). If the user writes in a different language, respond in the language they used.
 
 ### Response Style
 - Be concise and helpful
@@ -188,3 +186,38 @@ Always respond in the user's preferred language ({user_language}). If the user w
 - If an item isn't found, suggest checking spelling or searching more broadly
 - Never silently fail or ignore parts of the user's request
 """
+
+
+# Day-granular cache for today's ISO date: keyed on the local ordinal day
+# (not an epoch-day bucket, which rolls at UTC midnight and would serve a
+# stale date on non-UTC hosts), so per request this is one cheap date.today()
+# plus an integer compare instead of an isoformat render.
+_cached_today: tuple[int, str] = (-1, "")
+
+
+def _today_iso() -> str:
+    global _cached_today
+    today = date.today()
+    day = today.toordinal()
+    if day != _cached_today[0]:
+        _cached_today = (day, today.isoformat())
+    return _cached_today[1]
+
+
+def get_system_prompt(user_language: str = "en") -> str:
+    """Return the system prompt for the current date and user language."""
+    return _build_system_prompt(_today_iso(), user_language)
+
+
+@lru_cache(maxsize=8)
+def _build_system_prompt(today: str, user_language: str) -> str:
+    """Join the static body with the per-session suffix (cached per date + language)."""
+    return (
+        _STATIC_SYSTEM_PROMPT
+        + f"""
+## Session Context
+
+Today's date: {today}
+User's preferred language: {user_language}
+"""
+    )
@@ -1,5 +1,6 @@
 """State definitions for the tool-calling LangGraph agent."""
 
+import operator
 from typing import Annotated, Any, Literal
 from typing_extensions import TypedDict
 
@@ -11,23 +12,30 @@ class AgentState(TypedDict, total=False):
 
     messages: Annotated[list, add_messages]
     user_id: str
+    user_lang: str  # Detected once per turn in handle_input ("en"/"zh")
     pending_writes: list[dict[str, Any]] | None
     preview_message: str | None
     status: Literal["processing", "awaiting_info", "awaiting_confirm", "completed"]
     response: str
-    tool_calls_log: list[dict[str, Any]]
+    # Additive reducer: nodes return only their new entries and LangGraph
+    # appends them, so no node has to copy the accumulated log.
+    tool_calls_log: Annotated[list[dict[str, Any]], operator.add]
     pending_recipes: list[dict[str, Any]] | None  # Generated recipes awaiting save
 
 
-# Tool classification for routing
-READ_TOOLS = {
+# Tool classification for routing (immutable — these never change at runtime)
+READ_TOOLS = frozenset({
     "search_inventory", "get_batch_details", "get_shopping_list",
     "search_saved_recipes", "get_recipe_details",
     "get_meals", "get_meal_details",
-}
-WRITE_TOOLS = {
+})
+WRITE_TOOLS = frozenset({
     "add_item", "consume_item", "discard_batch", "update_item", "add_to_shopping_list",
     "generate_recipes_tool", "save_recipe", "save_all_recipes", "delete_recipe",
     "add_recipe_ingredients_to_shopping",
     "create_meal", "add_recipes_to_meal", "remove_recipe_from_meal", "delete_meal",
-}
+})
+
+# Flat name -> kind map so routing is one dict lookup per tool call
+TOOL_KIND = {t: "read" for t in READ_TOOLS}
+TOOL_KIND.update({t: "write" for t in WRITE_TOOLS})
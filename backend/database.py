@@ -1,6 +1,8 @@
 """Supabase client initialization with per-request user authentication."""
 
 import contextvars
+import threading
+import time
 
 from supabase import create_client, Client
 
@@ -12,41 +14,95 @@ _current_access_token: contextvars.ContextVar[str | None] = contextvars.ContextV
     "access_token", default=None
 )
 
+# Client caches. Building a Client per call throws away the underlying HTTP
+# session, so every Supabase query paid a fresh TCP + TLS handshake. Keyless
+# clients are process-wide singletons; user-authenticated clients are cached
+# per JWT (tokens are short-lived, so entries carry a TTL).
+_client_lock = threading.Lock()
+_service_client: Client | None = None
+_server_anon_client: Client | None = None
+_user_clients: dict[str, tuple[Client, float]] = {}
+_USER_CLIENT_TTL = 300  # seconds
+_USER_CLIENT_MAX = 1000
+
 
 def set_current_token(token: str) -> None:
     """Store the current user's JWT for downstream Supabase calls."""
     _current_access_token.set(token)
 
 
+def _get_user_client(token: str) -> Client:
+    """Get (or build) a client authenticated with the given user JWT."""
+    now = time.monotonic()
+
+    with _client_lock:
+        cached = _user_clients.get(token)
+        if cached and cached[1] > now:
+            return cached[0]
+
+    # User-authenticated client: publishable key + user JWT
+    # PostgREST uses the JWT for RLS evaluation
+    client = create_client(SUPABASE_URL, SUPABASE_PUBLISHABLE_KEY)
+    client.postgrest.auth(token)
+
+    with _client_lock:
+        if len(_user_clients) >= _USER_CLIENT_MAX:
+            expired = [k for k, (_, exp) in _user_clients.items() if exp <= now]
+            for k in expired:
+                del _user_clients[k]
+            if len(_user_clients) >= _USER_CLIENT_MAX:
+                _user_clients.clear()
+        _user_clients[token] = (client, now + _USER_CLIENT_TTL)
+
+    return client
+
+
 def get_supabase_client() -> Client:
     """Get Supabase client for server-side operations.
 
     Priority:
-    1. If a user JWT is set (via auth middleware), creates a client
+    1. If a user JWT is set (via auth middleware), returns a client
        authenticated as that user. RLS policies apply.
     2. If SUPABASE_SECRET_KEY is configured, uses secret key
        (bypasses RLS). Used for admin operations.
     3. Falls back to publishable key.
+
+    Clients are cached so keep-alive connections persist across calls.
     """
+    global _service_client, _server_anon_client
+
     token = _current_access_token.get()
     if token:
-        # User-authenticated client: publishable key + user JWT
-        # PostgREST uses the JWT for RLS evaluation
-        client = create_client(SUPABASE_URL, SUPABASE_PUBLISHABLE_KEY)
-        client.postgrest.auth(token)
-        return client
+        return _get_user_client(token)
 
     if SUPABASE_SECRET_KEY:
-        return create_client(SUPABASE_URL, SUPABASE_SECRET_KEY)
+        if _service_client is None:
+            with _client_lock:
+                if _service_client is None:
+                    _service_client = create_client(SUPABASE_URL, SUPABASE_SECRET_KEY)
+        return _service_client
 
-    return create_client(SUPABASE_URL, SUPABASE_PUBLISHABLE_KEY)
+    if _server_anon_client is None:
+        with _client_lock:
+            if _server_anon_client is None:
+                _server_anon_client = create_client(SUPABASE_URL, SUPABASE_PUBLISHABLE_KEY)
+    return _server_anon_client
 
 
 def get_supabase_admin_client() -> Client:
     """Get Supabase client with service role key (bypasses RLS)."""
-    return create_client(SUPABASE_URL, SUPABASE_SECRET_KEY)
+    global _service_client
+    if _service_client is None:
+        with _client_lock:
+            if _service_client is None:
+                _service_client = create_client(SUPABASE_URL, SUPABASE_SECRET_KEY)
+    return _service_client
 
 
 def get_supabase_anon_client() -> Client:
-    """Get Supabase client with publishable key (for auth operations)."""
+    """Get Supabase client with publishable key (for auth operations).
+
+    Always a fresh client: auth flows (sign-in/sign-up) mutate client-local
+    session state, so these must not be shared between users.
+    """
     return create_client(SUPABASE_URL, SUPABASE_PUBLISHABLE_KEY)
@@ -1,5 +1,11 @@
 """FastAPI application with Supabase Auth and multi-user support."""
 
+import asyncio
+import atexit
+import logging
+import logging.handlers
+import queue
+
 from fastapi import FastAPI, Depends, HTTPException, Response
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -11,6 +17,7 @@ from auth import get_current_user
 from database import get_supabase_client, get_supabase_anon_client
 from id_codec import decode_id, decode_or_int
 from agent.llm_factory import invalidate_llm_cache
+from agent.nodes import invalidate_user_language
 from schemas import (
     # Auth
     SignUpRequest, LoginRequest, AuthResponse, SignUpResponse, ProfileResponse, ProfileUpdate,
@@ -97,6 +104,32 @@ from services import (
 )
 
 
+def _setup_logging() -> None:
+    """Route log records through a queue so handlers never block request threads.
+
+    Emitting to stdout is a syscall per line; with a QueueHandler the hot
+    path only enqueues the record and a background QueueListener thread
+    does the actual writes.
+    """
+    log_queue: queue.Queue = queue.Queue(maxsize=10_000)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s")
+    )
+    listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    if root.level == logging.WARNING:  # don't override an explicit config
+        root.setLevel(logging.INFO)
+
+
+_setup_logging()
+
 app = FastAPI(title="Kitchen Loop AI")
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
@@ -227,6 +260,7 @@ def update_profile(update: ProfileUpdate, user_id: str = Depends(get_current_use
         raise HTTPException(status_code=400, detail="No fields to update")
     result = supabase.table("profiles").update(data).eq("id", user_id).execute()
     profile = result.data[0]
+    invalidate_user_language(user_id)
     return ProfileResponse(
         id=profile["id"],
         display_name=profile.get("display_name"),
@@ -349,10 +383,10 @@ def barcode_lookup(barcode: str, user_id: str = Depends(get_current_user)):
 
 @app.post("/api/v1/agent/photo-recognize", response_model=PhotoRecognizeResponse)
 @limiter.limit(AI_RATE_LIMIT)
-def photo_recognize(request: Request, response: Response, body: PhotoRecognizeRequest, quota: QuotaContext = Depends(check_and_deduct_credit)):
-    # Step 1: Recognize items in photo
+async def photo_recognize(request: Request, response: Response, body: PhotoRecognizeRequest, quota: QuotaContext = Depends(check_and_deduct_credit)):
+    # Step 1: Recognize items in photo (blocking LLM call — run off the loop)
     try:
-        recognition = recognize_image(quota.user_id, body.image_base64)
+        recognition = await asyncio.to_thread(recognize_image, quota.user_id, body.image_base64)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -367,7 +401,7 @@ def photo_recognize(request: Request, response: Response, body: PhotoRecognizeRe
 
     # Step 2: Convert to text and feed into agent
     agent_text = build_agent_text_from_items(items)
-    agent_result = run_agent(
+    agent_result = await run_agent(
         text=agent_text,
         user_id=quota.user_id,
         thread_id=body.thread_id,
@@ -498,12 +532,13 @@ def redeem_voucher_endpoint(body: VoucherRedeemRequest, user_id: str = Depends(g
 
 @app.post("/api/v1/agent/action", response_model=AgentActionResponse)
 @limiter.limit(AI_RATE_LIMIT)
-def agent_action(request: Request, response: Response, body: AgentActionRequest, quota: QuotaContext = Depends(check_credit_skip_confirm)):
-    # Only deduct credit for new messages, not confirm/cancel
+async def agent_action(request: Request, response: Response, body: AgentActionRequest, quota: QuotaContext = Depends(check_credit_skip_confirm)):
+    # Only deduct credit for new messages, not confirm/cancel. Run the
+    # blocking Supabase call in a worker thread to keep the event loop free.
     if body.confirm is None and quota.tier != "byok":
-        deduct_credit(quota.user_id, action="agent_chat")
+        await asyncio.to_thread(deduct_credit, quota.user_id, action="agent_chat")
 
-    result = run_agent(
+    result = await run_agent(
         text=body.text,
         user_id=quota.user_id,
         thread_id=body.thread_id,
@@ -0,0 +1,12 @@
+-- Agent conversations index migration
+-- Run in Supabase SQL editor
+
+-- Checkpoint lookups filter on (thread_id, status = 'active'); this partial
+-- unique index turns that into an index scan and guarantees at most one
+-- active row per thread. It does NOT arbitrate the checkpoint upsert:
+-- ON CONFLICT (thread_id) can only infer a non-partial unique index, so the
+-- upsert still depends on the table's full unique constraint on thread_id —
+-- keep that constraint in place.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_agent_conversations_thread_active
+    ON agent_conversations (thread_id)
+    WHERE status = 'active';
@@ -92,14 +92,9 @@ def recognize_image(user_id: str, image_base64: str) -> dict[str, Any]:
 def _parse_recognition_response(content: str) -> dict[str, Any]:
     """Parse AI response into structured recognition result."""
     try:
-        # Strip markdown code blocks if present
-        text = content.strip()
-        if text.startswith("```json"):
-            text = text[7:]
-        elif text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
+        # Strip markdown code blocks if present (shared helper with services)
+        from services import _strip_json_fences
+        text = _strip_json_fences(content.strip())
 
         result = json.loads(text.strip())
         items = result.get("items", [])
@@ -1,10 +1,11 @@
 """Business logic services using Supabase client."""
 
 from datetime import date, timedelta
-import json
 import re
 from typing import Any
 
+import orjson
+
 from database import get_supabase_client
 from id_codec import encode_id, decode_or_int, encode_inventory_row, encode_meal_row, encode_shopping_row, encode_recipe_row, encode_log_row, INVENTORY, RECIPE, MEAL, SHOPPING, LOG
 from schemas import (
@@ -62,18 +63,27 @@ def add_inventory_item(
     return encode_inventory_row(row)
 
 
-def get_inventory_grouped(user_id: str) -> list[InventoryGroupResponse]:
-    """Get inventory grouped by item_name for a user."""
+def get_inventory_grouped(
+    user_id: str,
+    item_name: str | None = None,
+) -> list[InventoryGroupResponse]:
+    """Get inventory grouped by item_name for a user.
+
+    When ``item_name`` is given the filter runs server-side (case
+    insensitive), so callers that only need one item don't transfer the
+    whole table.
+    """
     supabase = get_supabase_client()
 
-    result = (
+    query = (
         supabase.table("inventory")
         .select("*")
         .eq("user_id", user_id)
         .gt("quantity", 0)
-        .order("item_name")
-        .execute()
     )
+    if item_name:
+        query = query.ilike("item_name", item_name)
+    result = query.order("item_name").execute()
 
     # Group by item_name
     groups: dict[str, list[dict]] = {}
@@ -166,25 +176,51 @@ def consume_item(
     raw_input: str | None = None,
     ai_reasoning: str | None = None,
     source: str = "manual",
+    precomputed_plan: list[dict] | None = None,
 ) -> ConsumeResult:
-    """FEFO consumption scoped to user."""
+    """FEFO consumption scoped to user.
+
+    ``precomputed_plan`` is a FEFO plan built at preview time (agent flow).
+    When given, the planned batches are re-fetched by primary key and
+    revalidated against the planned quantities; on any drift the normal
+    search + FEFO sort runs instead, so stale plans can't misapply.
+    """
     supabase = get_supabase_client()
 
-    # Build query
-    query = (
-        supabase.table("inventory")
-        .select("*")
-        .eq("user_id", user_id)
-        .ilike("item_name", item_name)
-        .gt("quantity", 0)
-    )
+    batches = None
+    if precomputed_plan:
+        plan_ids = [decode_or_int(p["batch_id"]) for p in precomputed_plan]
+        result = (
+            supabase.table("inventory")
+            .select("*")
+            .eq("user_id", user_id)
+            .in_("id", plan_ids)
+            .gt("quantity", 0)
+            .execute()
+        )
+        rows = {r["id"]: r for r in result.data}
+        if len(rows) == len(plan_ids) and all(
+            abs(rows[i]["quantity"] - p["current_quantity"]) < 0.001
+            for i, p in zip(plan_ids, precomputed_plan)
+        ):
+            batches = [rows[i] for i in plan_ids]
+
+    if batches is None:
+        # Build query
+        query = (
+            supabase.table("inventory")
+            .select("*")
+            .eq("user_id", user_id)
+            .ilike("item_name", item_name)
+            .gt("quantity", 0)
+        )
 
-    if brand:
-        query = query.ilike("brand", brand)
+        if brand:
+            query = query.ilike("brand", brand)
 
-    # FEFO sort: is_open DESC, expiry_date ASC (nulls last)
-    result = query.order("is_open", desc=True).order("expiry_date", nullsfirst=False).execute()
-    batches = result.data
+        # FEFO sort: is_open DESC, expiry_date ASC (nulls last)
+        result = query.order("is_open", desc=True).order("expiry_date", nullsfirst=False).execute()
+        batches = result.data
 
     if not batches:
         return ConsumeResult(
@@ -750,6 +786,23 @@ def _get_assume_pantry_basics(user_id: str) -> bool:
     return True
 
 
+# Markdown code-fence wrappers around JSON payloads (```json ... ```)
+_JSON_FENCE_OPEN_RE = re.compile(r"^```(?:json)?\s*")
+_JSON_FENCE_CLOSE_RE = re.compile(r"\s*```$")
+
+# Trailing commas before a closing bracket — the most common way LLMs
+# produce almost-JSON. Repairing this locally avoids a retry round trip.
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+def _strip_json_fences(text: str) -> str:
+    """Remove a Markdown code fence wrapping a JSON payload, if present."""
+    if text.startswith("```"):
+        text = _JSON_FENCE_OPEN_RE.sub("", text)
+        text = _JSON_FENCE_CLOSE_RE.sub("", text)
+    return text
+
+
 def _coerce_json_payload(value: Any) -> Any:
     """Parse JSON strings returned by less strict structured-output providers."""
     if not isinstance(value, str):
@@ -759,14 +812,15 @@ def _coerce_json_payload(value: Any) -> Any:
     if not text:
         return value
 
-    if text.startswith("```"):
-        text = re.sub(r"^```(?:json)?\s*", "", text)
-        text = re.sub(r"\s*```$", "", text)
+    text = _strip_json_fences(text)
 
     try:
-        parsed = json.loads(text)
-    except json.JSONDecodeError:
-        return value
+        parsed = orjson.loads(text)
+    except orjson.JSONDecodeError:
+        try:
+            parsed = orjson.loads(_TRAILING_COMMA_RE.sub(r"\1", text))
+        except orjson.JSONDecodeError:
+            return value
 
     if isinstance(parsed, dict) and "recipes" in parsed:
         return parsed["recipes"]